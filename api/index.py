@@ -1,23 +1,19 @@
 import os
 import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Request
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 
 from .scraper import JobScraper
-from .webhooks.handlers import handle_github_webhook, handle_vercel_webhook
-
-app = FastAPI(title="Job Portal Connector", version="1.0.0")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+from .webhooks.handlers import (
+    GITHUB_WEBHOOK_SECRET,
+    VERCEL_WEBHOOK_SECRET,
+    handle_github_webhook,
+    handle_vercel_webhook,
 )
 
 # Check for environment variables
@@ -40,6 +36,31 @@ else:
     print("Warning: Supabase environment variables not configured. Scraper functionality disabled.")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the scraper's HTTP connections on shutdown"""
+    yield
+    if scraper:
+        await scraper.aclose()
+
+
+app = FastAPI(
+    title="Job Portal Connector",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
 class ScrapeRequest(BaseModel):
     portal_url: str
     username: str
@@ -93,10 +114,14 @@ async def scrape_job_portal(request: ScrapeRequest):
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
 
+# Health response never changes, serialize it once
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "job-portal-connector"})
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "job-portal-connector"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
 
 @app.post("/webhooks/github")
@@ -104,11 +129,11 @@ async def github_webhook_endpoint(request: Request):
     """GitHub webhook endpoint"""
     try:
         result = await handle_github_webhook(request)
-        return JSONResponse(content=result, status_code=200)
+        return ORJSONResponse(content=result, status_code=200)
     except HTTPException as e:
-        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+        return ORJSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        return ORJSONResponse(content={"error": str(e)}, status_code=500)
 
 
 @app.post("/webhooks/vercel")
@@ -116,33 +141,39 @@ async def vercel_webhook_endpoint(request: Request):
     """Vercel webhook endpoint"""
     try:
         result = await handle_vercel_webhook(request)
-        return JSONResponse(content=result, status_code=200)
+        return ORJSONResponse(content=result, status_code=200)
     except HTTPException as e:
-        return JSONResponse(content={"error": e.detail}, status_code=e.status_code)
+        return ORJSONResponse(content={"error": e.detail}, status_code=e.status_code)
     except Exception as e:
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        return ORJSONResponse(content={"error": str(e)}, status_code=500)
 
 
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    env_status = {
+# Environment is only read at import time (scraper, webhook secrets), so the
+# root response is fixed for the lifetime of the process
+_ROOT_BODY = orjson.dumps({
+    "message": "Job Portal Connector API",
+    "status": "running",
+    "environment": {
         "supabase_configured": bool(supabase_url and supabase_key),
         "scraper_available": scraper is not None,
-        "github_webhook_secret": bool(os.getenv("GITHUB_WEBHOOK_SECRET")),
-        "vercel_webhook_secret": bool(os.getenv("VERCEL_WEBHOOK_SECRET"))
-    }
-    
-    return {
-        "message": "Job Portal Connector API",
-        "status": "running",
-        "environment": env_status
+        "github_webhook_secret": bool(GITHUB_WEBHOOK_SECRET),
+        "vercel_webhook_secret": bool(VERCEL_WEBHOOK_SECRET)
     }
+})
+
+
+@app.get("/")
+async def root():
+    """Root endpoint"""
+    return Response(content=_ROOT_BODY, media_type="application/json")
+
+# Response body does not depend on the request, serialize it once
+_NOT_FOUND_BODY = orjson.dumps({"message": "Route not found", "available_routes": [
+    "/", "/api/health", "/webhooks/github", "/webhooks/vercel", "/api/scrape"
+]})
 
 # Handle all other routes for SPA compatibility
 @app.get("/{path:path}")
 async def catch_all(path: str):
     """Catch-all for undefined routes"""
-    return {"message": f"Route /{path} not found", "available_routes": [
-        "/", "/api/health", "/webhooks/github", "/webhooks/vercel", "/api/scrape"
-    ]}
+    return Response(content=_NOT_FOUND_BODY, status_code=404, media_type="application/json")
@@ -1,16 +1,51 @@
 import asyncio
-from typing import Any, Dict, List
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 
 import httpx
 
 from supabase import Client, create_client
 
+# Rows per PostgREST request when storing candidates
+CANDIDATE_BATCH_SIZE = 500
+
+# Matches max_rows in supabase/config.toml, a larger page would be truncated
+# by PostgREST and end the paging loop early
+PHONE_HASH_PAGE_SIZE = 1000
+
+# Browser-Use polling schedule in seconds
+POLL_INITIAL_DELAY = 0.5
+POLL_MAX_DELAY = 10.0
+POLL_BACKOFF = 1.5
+TASK_MAX_WAIT = 600.0
+
+# Company/position id cache, ids never change so staleness only matters if
+# rows are deleted
+LOOKUP_CACHE_TTL = 300.0
+LOOKUP_CACHE_SIZE = 1024
+
 
 class JobScraper:
     def __init__(self, supabase_url: str, supabase_key: str, browser_use_api_key: str):
         self.supabase: Client = create_client(supabase_url, supabase_key)
         self.browser_use_api_key = browser_use_api_key
         self.browser_use_base_url = "https://api.browser-use.com/api/v1"
+        # Shared across tasks so polling reuses warm connections
+        self._client = httpx.AsyncClient(
+            base_url=self.browser_use_base_url,
+            headers={"Authorization": f"Bearer {self.browser_use_api_key}"},
+            http2=True,
+            timeout=30.0,
+        )
+        self._company_cache: Dict[str, Tuple[str, float]] = {}
+        self._position_cache: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._position_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    async def aclose(self) -> None:
+        """Close the Browser-Use HTTP client"""
+        await self._client.aclose()
 
     async def scrape_candidates(
         self,
@@ -23,26 +58,20 @@ class JobScraper:
         """
         Main scraping workflow:
         1. Create/get company and position
-        2. Get existing phone hashes for this position
-        3. Run Browser-Use task
-        4. Process and store candidates
+        2. Run Browser-Use task
+        3. Store candidates, duplicates are dropped by the database
         """
 
         # Step 1: Ensure company and position exist
         company_id = await self._ensure_company(company_name)
         position_id = await self._ensure_position(company_id, position_name)
 
-        # Step 2: Get existing phone hashes to avoid duplicates
-        existing_hashes = await self._get_existing_phone_hashes(position_id)
-        skip_hashes_csv = ",".join(existing_hashes)
-
-        # Step 3: Prepare Browser-Use task
+        # Step 2: Prepare Browser-Use task
         task_payload = {
             "task": self._build_scraping_task(portal_url, position_name),
             "secrets": {
                 "username": username,
                 "password": password,
-                "skip_hashes_csv": skip_hashes_csv,
             },
             "allowed_domains": [self._extract_domain(portal_url)],
             "structured_output_json": {
@@ -60,68 +89,126 @@ class JobScraper:
             "save_browser_data": True,
         }
 
-        # Step 4: Execute Browser-Use task
+        # Step 3: Execute Browser-Use task
         candidates_data = await self._run_browser_use_task(task_payload)
 
-        # Step 5: Store candidates in database
+        # Step 4: Store candidates in database
         result = await self._store_candidates(position_id, candidates_data, portal_url)
 
         return result
 
     async def _ensure_company(self, company_name: str) -> str:
         """Create or get company record"""
+        company_id = self._cache_get(self._company_cache, company_name)
+        if company_id:
+            return company_id
+
         # Try to get existing company
-        result = (
+        result = await asyncio.to_thread(
             self.supabase.table("companies")
             .select("id")
             .eq("name", company_name)
-            .execute()
+            .execute
         )
 
-        if result.data:
-            return result.data[0]["id"]
+        if not result.data:
+            # Create new company, a concurrent scrape may have inserted it
+            # since the lookup so upsert on the unique name instead
+            result = await asyncio.to_thread(
+                self.supabase.table("companies")
+                .upsert({"name": company_name}, on_conflict="name")
+                .execute
+            )
 
-        # Create new company
-        result = (
-            self.supabase.table("companies").insert({"name": company_name}).execute()
-        )
-        return result.data[0]["id"]
+        company_id = result.data[0]["id"]
+        self._cache_put(self._company_cache, company_name, company_id)
+        return company_id
 
     async def _ensure_position(self, company_id: str, position_title: str) -> str:
         """Create or get position record"""
-        # Try to get existing position
-        result = (
-            self.supabase.table("positions")
-            .select("id")
-            .eq("company_id", company_id)
-            .eq("title", position_title)
-            .execute()
-        )
-
-        if result.data:
-            return result.data[0]["id"]
+        cache_key = (company_id, position_title)
+        position_id = self._cache_get(self._position_cache, cache_key)
+        if position_id:
+            return position_id
+
+        # positions has no unique constraint, serialise the lookup and insert
+        # per key so concurrent scrapes in this worker do not create the same
+        # position twice
+        lock = self._position_locks.setdefault(cache_key, asyncio.Lock())
+        async with lock:
+            position_id = self._cache_get(self._position_cache, cache_key)
+            if position_id:
+                return position_id
+
+            # Try to get existing position
+            result = await asyncio.to_thread(
+                self.supabase.table("positions")
+                .select("id")
+                .eq("company_id", company_id)
+                .eq("title", position_title)
+                .execute
+            )
 
-        # Create new position
-        result = (
-            self.supabase.table("positions")
-            .insert({"company_id": company_id, "title": position_title})
-            .execute()
-        )
-        return result.data[0]["id"]
+            if not result.data:
+                # Create new position
+                result = await asyncio.to_thread(
+                    self.supabase.table("positions")
+                    .insert({"company_id": company_id, "title": position_title})
+                    .execute
+                )
 
-    async def _get_existing_phone_hashes(self, position_id: str) -> List[str]:
+            position_id = result.data[0]["id"]
+            self._cache_put(self._position_cache, cache_key, position_id)
+
+        # Later callers hit the cache, the lock is only needed while it is cold
+        self._position_locks.pop(cache_key, None)
+        return position_id
+
+    @staticmethod
+    def _cache_get(cache: Dict[Any, Tuple[str, float]], key: Any) -> Optional[str]:
+        """Return a cached id unless it has expired"""
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del cache[key]
+            return None
+        return value
+
+    @staticmethod
+    def _cache_put(cache: Dict[Any, Tuple[str, float]], key: Any, value: str) -> None:
+        """Cache an id, evicting the oldest entry once the cache is full"""
+        if key not in cache and len(cache) >= LOOKUP_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[key] = (value, time.monotonic() + LOOKUP_CACHE_TTL)
+
+    async def _get_existing_phone_hashes(self, position_id: str) -> Set[str]:
         """Get all existing phone hashes for this position to avoid duplicates"""
-        result = (
-            self.supabase.table("candidates")
-            .select("phone_sha256")
-            .eq("position_id", position_id)
-            .execute()
-        )
-        return [
-            record["phone_sha256"] for record in result.data if record["phone_sha256"]
-        ]
+        hashes: Set[str] = set()
+        offset = 0
+        while True:
+            result = await asyncio.to_thread(
+                self.supabase.table("candidates")
+                .select("phone_sha256")
+                .eq("position_id", position_id)
+                # Without a stable order pages may skip or repeat rows
+                .order("id")
+                .range(offset, offset + PHONE_HASH_PAGE_SIZE - 1)
+                .execute
+            )
+            hashes.update(
+                record["phone_sha256"]
+                for record in result.data
+                if record["phone_sha256"]
+            )
+            if len(result.data) < PHONE_HASH_PAGE_SIZE:
+                return hashes
+            offset += PHONE_HASH_PAGE_SIZE
 
-    def _build_scraping_task(self, portal_url: str, position_name: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _build_scraping_task(portal_url: str, position_name: str) -> str:
         """Build the task description for Browser-Use agent"""
         return f"""## Cíl
 Přihlaš se na {portal_url} pomocí zadaných přihlašovacích údajů.
@@ -133,83 +220,110 @@ U každého kandidáta vytěž:
   – email
   – phone
 
-Bezpečnost duplicit:
-  1. Před uložením každého kandidáta spočítej `sha256(phone_number)` → hex.
-  2. Máš CSV seznam hashů v tajné proměnné `skip_hashes_csv`.
-  3. Jestliže hash existuje v seznamu, kandidáta zcela ignoruj.
-
 Výstup:
   Vrať jediný JSON podle `structured_output_json` schématu.
-(agent tak splní požadavek "nikdy nezapsat duplicitního kandidáta")."""
+  Duplicity neřeš, kandidáty se stejným telefonem odfiltruje databáze."""
 
     def _extract_domain(self, url: str) -> str:
         """Extract domain from URL for allowed_domains"""
-        from urllib.parse import urlparse
-
-        parsed = urlparse(url)
-        return parsed.netloc
+        # Fast path for plain scheme://host/... URLs, anything unusual (no
+        # scheme, a "://" later in the URL, query or fragment right after the
+        # host) goes through urlparse
+        scheme, sep, rest = url.partition("://")
+        if sep and scheme.isalpha():
+            domain = rest.split("/", 1)[0]
+            if "?" not in domain and "#" not in domain:
+                return domain
+        return urlparse(url).netloc
 
     async def _run_browser_use_task(
-        self, task_payload: Dict[str, Any]
+        self, task_payload: Dict[str, Any], max_wait: float = TASK_MAX_WAIT
     ) -> List[Dict[str, str]]:
         """Execute Browser-Use task and poll for results"""
-        async with httpx.AsyncClient() as client:
-            # Start task
-            response = await client.post(
-                f"{self.browser_use_base_url}/run-task",
-                json=task_payload,
-                headers={"Authorization": f"Bearer {self.browser_use_api_key}"},
-            )
-            response.raise_for_status()
-            task_data = response.json()
-            task_id = task_data["id"]
-
-            # Poll for completion
-            while True:
-                await asyncio.sleep(5)  # Wait 5 seconds between polls
-
-                status_response = await client.get(
-                    f"{self.browser_use_base_url}/task/{task_id}",
-                    headers={"Authorization": f"Bearer {self.browser_use_api_key}"},
+        # Start task
+        response = await self._client.post("/run-task", json=task_payload)
+        response.raise_for_status()
+        task_data = response.json()
+        task_id = task_data["id"]
+
+        # Poll for completion, short tasks are picked up quickly while long
+        # ones back off to fewer requests
+        delay = POLL_INITIAL_DELAY
+        deadline = time.monotonic() + max_wait
+        while True:
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(
+                    f"Browser-Use task {task_id} did not finish within {max_wait}s"
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+            status_response = await self._client.get(f"/task/{task_id}")
+            status_response.raise_for_status()
+            status_data = status_response.json()
+
+            if status_data["status"] == "finished":
+                return status_data.get("output", [])
+            elif status_data["status"] == "failed":
+                raise Exception(
+                    f"Browser-Use task failed: {status_data.get('error', 'Unknown error')}"
                 )
-                status_response.raise_for_status()
-                status_data = status_response.json()
-
-                if status_data["status"] == "finished":
-                    return status_data.get("output", [])
-                elif status_data["status"] == "failed":
-                    raise Exception(
-                        f"Browser-Use task failed: {status_data.get('error', 'Unknown error')}"
-                    )
 
-                # Continue polling if status is "running" or "pending"
+            # Continue polling if status is "running" or "pending"
 
     async def _store_candidates(
         self, position_id: str, candidates_data: List[Dict[str, str]], source_url: str
     ) -> Dict[str, int]:
         """Store candidates in database with duplicate prevention"""
+        # The agent may list the same candidate twice, drop repeats before they
+        # reach the database. phone_sha256 is derived from phone alone, so equal
+        # phones are exactly the rows the unique constraint would reject.
+        # Candidates without a phone never conflict and are always kept.
+        seen_phones: Set[str] = set()
+        unique_candidates = []
+        for candidate in candidates_data:
+            phone = candidate.get("phone")
+            if phone is not None:
+                if phone in seen_phones:
+                    continue
+                seen_phones.add(phone)
+            unique_candidates.append(candidate)
+
         inserted = 0
-        skipped = 0
+        for start in range(0, len(unique_candidates), CANDIDATE_BATCH_SIZE):
+            inserted += await self._store_candidates_chunk(
+                position_id,
+                unique_candidates[start : start + CANDIDATE_BATCH_SIZE],
+                source_url,
+            )
 
-        for candidate in candidates_data:
-            try:
-                # Prepare candidate record
-                candidate_record = {
-                    "position_id": position_id,
-                    "first_name": candidate.get("first_name"),
-                    "last_name": candidate.get("last_name"),
-                    "email": candidate.get("email"),
-                    "phone": candidate.get("phone"),
-                    "source_url": source_url,
-                }
-
-                # Try to insert (will fail if duplicate phone_sha256 + position_id)
-                self.supabase.table("candidates").insert(candidate_record).execute()
-                inserted += 1
-
-            except Exception:
-                # Likely a duplicate, count as skipped
-                skipped += 1
-                continue
-
-        return {"inserted": inserted, "skipped": skipped}
+        return {"inserted": inserted, "skipped": len(candidates_data) - inserted}
+
+    async def _store_candidates_chunk(
+        self, position_id: str, candidates_data: List[Dict[str, str]], source_url: str
+    ) -> int:
+        """Upsert one chunk of candidates, returning the number of new rows"""
+        records = [
+            {
+                "position_id": position_id,
+                "first_name": candidate.get("first_name"),
+                "last_name": candidate.get("last_name"),
+                "email": candidate.get("email"),
+                "phone": candidate.get("phone"),
+                "source_url": source_url,
+            }
+            for candidate in candidates_data
+        ]
+
+        # The (position_id, phone_sha256) constraint drops duplicates,
+        # only newly inserted rows are returned
+        result = await asyncio.to_thread(
+            self.supabase.table("candidates")
+            .upsert(
+                records,
+                on_conflict="position_id,phone_sha256",
+                ignore_duplicates=True,
+            )
+            .execute
+        )
+        return len(result.data)
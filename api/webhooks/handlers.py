@@ -1,40 +1,47 @@
-import json
 import hmac
-import hashlib
+import logging
 import os
 from datetime import datetime
+import orjson
 from fastapi import Request, HTTPException
 from typing import Dict, Any
 
-def verify_github_signature(body: bytes, signature: str, secret: str) -> bool:
+logger = logging.getLogger(__name__)
+
+# Webhook secrets are read and encoded once, they are HMAC keys on every request
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', '').encode('utf-8')
+VERCEL_WEBHOOK_SECRET = os.getenv('VERCEL_WEBHOOK_SECRET', '').encode('utf-8')
+
+def verify_github_signature(body: bytes, signature: str, secret: bytes) -> bool:
     """Verify GitHub webhook signature"""
-    if not signature or not secret:
+    if not secret:
         return True  # Skip verification if not configured
     
     if not signature.startswith('sha256='):
         return False
     
-    expected_signature = hmac.new(
-        secret.encode('utf-8'),
-        body,
-        hashlib.sha256
-    ).hexdigest()
+    try:
+        provided_signature = bytes.fromhex(signature[7:])  # Remove 'sha256=' prefix
+    except ValueError:
+        return False
+    
+    expected_signature = hmac.digest(secret, body, 'sha256')
     
-    provided_signature = signature[7:]  # Remove 'sha256=' prefix
     return hmac.compare_digest(expected_signature, provided_signature)
 
-def verify_vercel_signature(body: bytes, signature: str, secret: str) -> bool:
+def verify_vercel_signature(body: bytes, signature: str, secret: bytes) -> bool:
     """Verify Vercel webhook signature"""
-    if not signature or not secret:
+    if not secret:
         return True  # Skip verification if not configured
     
-    expected_signature = hmac.new(
-        secret.encode('utf-8'),
-        body,
-        hashlib.sha1
-    ).hexdigest()
+    try:
+        provided_signature = bytes.fromhex(signature)
+    except ValueError:
+        return False
+    
+    expected_signature = hmac.digest(secret, body, 'sha1')
     
-    return hmac.compare_digest(signature, expected_signature)
+    return hmac.compare_digest(expected_signature, provided_signature)
 
 async def handle_github_webhook(request: Request) -> Dict[str, Any]:
     """Handle incoming GitHub webhook"""
@@ -44,15 +51,13 @@ async def handle_github_webhook(request: Request) -> Dict[str, Any]:
         event_type = request.headers.get('x-github-event', '')
         delivery_id = request.headers.get('x-github-delivery', '')
         
-        github_secret = os.getenv('GITHUB_WEBHOOK_SECRET', '')
-        
         # Verify signature if secret is configured
-        if github_secret and not verify_github_signature(body, signature, github_secret):
+        if GITHUB_WEBHOOK_SECRET and not verify_github_signature(body, signature, GITHUB_WEBHOOK_SECRET):
             raise HTTPException(status_code=401, detail="Invalid signature")
         
-        payload = json.loads(body.decode('utf-8'))
+        payload = orjson.loads(body)
         
-        print(f"Received GitHub webhook: {event_type} (delivery: {delivery_id})")
+        logger.info("Received GitHub webhook: %s (delivery: %s)", event_type, delivery_id)
         
         # Handle different GitHub events
         result = {"success": True, "event_type": event_type, "delivery_id": delivery_id}
@@ -76,8 +81,10 @@ async def handle_github_webhook(request: Request) -> Dict[str, Any]:
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error processing GitHub webhook: {e}")
+        logger.error("Error processing GitHub webhook: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 async def handle_vercel_webhook(request: Request) -> Dict[str, Any]:
@@ -86,16 +93,14 @@ async def handle_vercel_webhook(request: Request) -> Dict[str, Any]:
         body = await request.body()
         signature = request.headers.get('x-vercel-signature', '')
         
-        vercel_secret = os.getenv('VERCEL_WEBHOOK_SECRET', '')
-        
         # Verify signature if secret is configured
-        if vercel_secret and not verify_vercel_signature(body, signature, vercel_secret):
+        if VERCEL_WEBHOOK_SECRET and not verify_vercel_signature(body, signature, VERCEL_WEBHOOK_SECRET):
             raise HTTPException(status_code=401, detail="Invalid signature")
         
-        payload = json.loads(body.decode('utf-8'))
+        payload = orjson.loads(body)
         event_type = payload.get('type', '')
         
-        print(f"Received Vercel webhook: {event_type}")
+        logger.info("Received Vercel webhook: %s", event_type)
         
         result = {"success": True, "event_type": event_type}
         
@@ -125,6 +130,8 @@ async def handle_vercel_webhook(request: Request) -> Dict[str, Any]:
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error processing Vercel webhook: {e}")
+        logger.error("Error processing Vercel webhook: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -3,8 +3,29 @@
 Check for existing Vercel deployments and help configure webhooks
 """
 
-import requests
-import json
+import asyncio
+import httpx
+
+async def probe_url(client, url):
+    """Probe a deployment's health and webhook endpoints, returning (health, webhook)"""
+    health = await client.get(f"{url}/api/health")
+    if health.status_code != 200:
+        return health, None
+    # Only confirmed deployments are checked for our webhook endpoints
+    # Unsigned empty POST, GET would hit the catch-all and HEAD is 405 anywhere
+    try:
+        webhook = await client.post(f"{url}/webhooks/github", json={}, timeout=5.0)
+    except httpx.HTTPError as e:
+        # Keep the health result, a failed webhook probe is reported on its own
+        return health, e
+    return health, webhook
+
+async def probe_urls(urls):
+    """Probe all URLs concurrently"""
+    async with httpx.AsyncClient(timeout=10.0, http2=True) as client:
+        return await asyncio.gather(
+            *(probe_url(client, url) for url in urls), return_exceptions=True
+        )
 
 def check_common_vercel_urls():
     """Check common Vercel URL patterns"""
@@ -22,29 +43,35 @@ def check_common_vercel_urls():
     
     working_urls = []
     
-    for url in potential_urls:
-        try:
-            print(f"   Checking: {url}")
-            response = requests.get(f"{url}/api/health", timeout=10)
+    results = asyncio.run(probe_urls(potential_urls))
+    
+    for url, result in zip(potential_urls, results):
+        print(f"   Checking: {url}")
+        
+        if isinstance(result, httpx.HTTPError):
+            print(f"   ❌ Error checking {url}: {result}")
+            continue
+        elif isinstance(result, Exception):
+            raise result
+        
+        response, webhook_test = result
+        
+        if response.status_code == 200:
+            print(f"   ✅ FOUND: {url}")
+            working_urls.append(url)
             
-            if response.status_code == 200:
-                print(f"   ✅ FOUND: {url}")
-                working_urls.append(url)
-                
-                # Check if it has our webhook endpoints
-                webhook_test = requests.get(f"{url}/webhooks/github", timeout=5)
-                if webhook_test.status_code == 405:  # Method not allowed is expected
-                    print(f"      ✅ Webhook endpoints available")
-                else:
-                    print(f"      ⚠️ Webhook endpoints may not be available (status: {webhook_test.status_code})")
-                    
-            elif response.status_code == 404:
-                print(f"   ❌ Not found: {url}")
+            # Check if it has our webhook endpoints
+            if isinstance(webhook_test, httpx.HTTPError):
+                print(f"      ⚠️ Could not check webhook endpoints: {webhook_test}")
+            elif webhook_test.status_code not in (404, 405):  # Any handler answer
+                print(f"      ✅ Webhook endpoints available")
             else:
-                print(f"   ⚠️ Unexpected status {response.status_code}: {url}")
+                print(f"      ⚠️ Webhook endpoints may not be available (status: {webhook_test.status_code})")
                 
-        except requests.exceptions.RequestException as e:
-            print(f"   ❌ Error checking {url}: {e}")
+        elif response.status_code == 404:
+            print(f"   ❌ Not found: {url}")
+        else:
+            print(f"   ⚠️ Unexpected status {response.status_code}: {url}")
     
     return working_urls
 
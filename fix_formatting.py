@@ -4,23 +4,71 @@ Simple script to fix all formatting issues in the project.
 Run: python fix_formatting.py
 """
 
+import asyncio
 import os
-import subprocess
 import sys
 
 
-def run_command(cmd, description):
+async def run_command(args, description):
     """Run a command and return True if successful"""
     print(f"🔄 {description}...")
-    try:
-        subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode == 0:
         print(f"✅ {description} completed successfully")
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {description} failed:")
-        print(f"   Command: {cmd}")
-        print(f"   Error: {e.stderr}")
-        return False
+
+    print(f"❌ {description} failed:")
+    print(f"   Command: python3 {' '.join(args)}")
+    print(f"   Error: {(stderr or stdout).decode(errors='replace')}")
+    return False
+
+
+async def run_all():
+    """Run the formatting pipeline, returning (succeeded, total) step counts"""
+    # Installing and formatting must run in order, the formatters rewrite files
+    steps = [
+        (
+            ["-m", "pip", "install", "black", "isort", "flake8"],
+            "Installing formatting tools",
+        ),
+        (["-m", "black", "."], "Running Black formatter"),
+        (["-m", "isort", "."], "Running isort import sorter"),
+    ]
+    # Checks only read files, so they can run side by side
+    checks = [
+        (["-m", "black", "--check", "."], "Verifying Black formatting"),
+        (["-m", "isort", "--check-only", "."], "Verifying isort formatting"),
+        (
+            [
+                "-m",
+                "flake8",
+                ".",
+                "--max-line-length=88",
+                "--extend-ignore=E203,W503,E501",
+            ],
+            "Running flake8 code quality check",
+        ),
+    ]
+
+    results = []
+    for args, description in steps:
+        results.append(await run_command(args, description))
+    results.extend(
+        await asyncio.gather(
+            *(run_command(args, description) for args, description in checks)
+        )
+    )
+
+    if not all(results):
+        print("\n⚠️  Some issues found. You may need to fix them manually.")
+
+    return sum(results), len(results)
 
 
 def main():
@@ -30,30 +78,11 @@ def main():
     # Change to script directory
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-    # Commands to run
-    commands = [
-        ("python3 -m pip install black isort flake8", "Installing formatting tools"),
-        ("python3 -m black .", "Running Black formatter"),
-        ("python3 -m isort .", "Running isort import sorter"),
-        ("python3 -m black --check .", "Verifying Black formatting"),
-        ("python3 -m isort --check-only .", "Verifying isort formatting"),
-        (
-            "python3 -m flake8 . --max-line-length=88 --extend-ignore=E203,W503,E501",
-            "Running flake8 code quality check",
-        ),
-    ]
-
-    # Run all commands
-    success_count = 0
-    for cmd, description in commands:
-        if run_command(cmd, description):
-            success_count += 1
-        else:
-            print("\n⚠️  Some issues found. You may need to fix them manually.")
+    success_count, total = asyncio.run(run_all())
 
-    print(f"\n📊 Results: {success_count}/{len(commands)} steps completed successfully")
+    print(f"\n📊 Results: {success_count}/{total} steps completed successfully")
 
-    if success_count == len(commands):
+    if success_count == total:
         print("🎉 All formatting checks passed!")
         return 0
     else:
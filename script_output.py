@@ -0,0 +1,52 @@
+"""
+Progress output shared by the deployment and webhook check scripts
+"""
+
+import logging
+import os
+import sys
+
+
+class BufferedStdoutHandler(logging.Handler):
+    """Hold formatted records and write them to stdout in one call on flush"""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = []
+
+    def emit(self, record):
+        self._buffer.append(self.format(record))
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._buffer:
+                sys.stdout.write("\n".join(self._buffer) + "\n")
+                sys.stdout.flush()
+                self._buffer.clear()
+        finally:
+            self.release()
+
+
+def setup_progress(logger):
+    """Attach a buffered stdout handler to a script's logger and return it
+
+    Only the script's own logger is configured, so library loggers such as httpx
+    stay quiet. Set LOG_LEVEL=WARNING to print only the summary.
+    """
+    handler = BufferedStdoutHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(os.getenv('LOG_LEVEL', 'INFO'))
+    return handler
+
+
+def note(lines, msg, *args):
+    """Queue a progress line for emit, it is only formatted if it gets logged"""
+    lines.append((msg, args))
+
+
+def emit(logger, lines):
+    """Log queued progress lines in order"""
+    for msg, args in lines:
+        logger.info(msg, *args)
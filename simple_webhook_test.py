@@ -5,64 +5,130 @@ Tests webhook functionality without complex dependencies
 """
 
 import os
-import json
 import time
 import hmac
-import hashlib
 import sys
+import asyncio
+import logging
 
-try:
-    import requests
-except ImportError:
-    print("❌ requests library not available. Installing...")
-    os.system("pip install requests")
-    import requests
+import httpx
+import orjson
+
+from script_output import setup_progress
+
+logger = logging.getLogger(__name__)
 
 # Configuration from environment variables
 SUPABASE_URL = os.getenv('SUPABASE_URL', 'https://your-project-ref.supabase.co')
 GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', 'your-webhook-secret')
 WEBHOOK_ENDPOINT = f"{SUPABASE_URL}/functions/v1/github-webhook"
+_SECRET_BYTES = GITHUB_WEBHOOK_SECRET.encode('utf-8')
+
+# Read the clock once, delivery ids are derived from it and stay unique per run
+RUN_ID = time.time_ns()
+
+# Headers shared by every webhook request, set once on the client
+BASE_HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'GitHub-Hookshot/test'
+}
+
+SIGNATURE_PREFIX = "sha256="
+
+def create_github_signature(payload: bytes) -> str:
+    """Create GitHub webhook signature with the configured secret"""
+    return SIGNATURE_PREFIX + hmac.digest(_SECRET_BYTES, payload, "sha256").hex()
+
+EVENT_PAYLOADS = [
+    {
+        "event_type": "issues",
+        "payload": {
+            "action": "opened",
+            "issue": {
+                "number": 42,
+                "title": "Test Issue from Webhook Integration",
+                "html_url": "https://github.com/test-user/test-repo/issues/42",
+                "state": "open",
+                "user": {
+                    "login": "test-user"
+                }
+            },
+            "repository": {
+                "name": "test-repo",
+                "full_name": "test-user/test-repo",
+                "html_url": "https://github.com/test-user/test-repo"
+            },
+            "sender": {
+                "login": "test-user"
+            }
+        }
+    },
+    {
+        "event_type": "pull_request",
+        "payload": {
+            "action": "opened",
+            "pull_request": {
+                "number": 123,
+                "title": "Test PR from Webhook Integration",
+                "html_url": "https://github.com/test-user/test-repo/pull/123",
+                "state": "open",
+                "user": {
+                    "login": "test-user"
+                }
+            },
+            "repository": {
+                "name": "test-repo",
+                "full_name": "test-user/test-repo",
+                "html_url": "https://github.com/test-user/test-repo"
+            },
+            "sender": {
+                "login": "test-user"
+            }
+        }
+    }
+]
 
-def create_github_signature(payload: str, secret: str) -> str:
-    """Create GitHub webhook signature"""
-    signature = hmac.new(
-        secret.encode('utf-8'),
-        payload.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
-    return f"sha256={signature}"
+# Payloads are static, serialize and sign them once
+EVENTS = []
+for _event in EVENT_PAYLOADS:
+    _payload_bytes = orjson.dumps(_event["payload"])
+    EVENTS.append({
+        "event_type": _event["event_type"],
+        "payload_bytes": _payload_bytes,
+        "signature": create_github_signature(_payload_bytes),
+    })
 
-def test_edge_function_deployment():
+async def check_edge_function_deployment(client):
     """Test if the Edge Function is deployed and accessible"""
-    print("🔄 Testing Edge Function Deployment")
-    print("-" * 40)
+    logger.info("🔄 Testing Edge Function Deployment")
+    logger.info("-" * 40)
     
     try:
-        # Test with a simple GET request (should return 405 Method Not Allowed)
-        response = requests.get(WEBHOOK_ENDPOINT, timeout=10)
+        # Only the status matters (should return 405 Method Not Allowed), the
+        # function rejects every non-POST method so HEAD avoids downloading a body
+        response = await client.head(WEBHOOK_ENDPOINT, timeout=10)
         
         if response.status_code == 405:
-            print("✅ Edge Function is deployed and accessible")
-            print(f"   Response: {response.status_code} - Method Not Allowed (expected)")
+            logger.info("✅ Edge Function is deployed and accessible")
+            logger.info("   Response: %s - Method Not Allowed (expected)", response.status_code)
             return True
         elif response.status_code == 404:
-            print("❌ Edge Function not found - check deployment")
-            print("   Run: supabase functions deploy github-webhook --no-verify-jwt")
+            logger.info("❌ Edge Function not found - check deployment")
+            logger.info("   Run: supabase functions deploy github-webhook --no-verify-jwt")
             return False
         else:
-            print(f"⚠️ Unexpected response from Edge Function: {response.status_code}")
-            print(f"   Response text: {response.text[:200]}")
+            logger.info("⚠️ Unexpected response from Edge Function: %s", response.status_code)
             return False
             
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Cannot reach Edge Function: {e}")
-        print("   Check if Supabase URL is correct and function is deployed")
+    except httpx.HTTPError as e:
+        logger.info("❌ Cannot reach Edge Function: %s", e)
+        logger.info("   Check if Supabase URL is correct and function is deployed")
         return False
 
-def test_incoming_webhook():
+async def run_incoming_webhook(client):
     """Test incoming webhook from GitHub to Supabase"""
-    print("\n🔄 Testing Incoming Webhook (GitHub → Supabase)")
-    print("-" * 50)
+    logger.info("\n🔄 Testing Incoming Webhook (GitHub → Supabase)")
+    logger.info("-" * 50)
     
     # Sample GitHub push event payload
     test_payload = {
@@ -89,169 +155,125 @@ def test_incoming_webhook():
         ]
     }
     
-    payload_str = json.dumps(test_payload)
-    signature = create_github_signature(payload_str, GITHUB_WEBHOOK_SECRET)
+    payload_bytes = orjson.dumps(test_payload)
+    signature = create_github_signature(payload_bytes)
     
     headers = {
-        'Content-Type': 'application/json',
         'X-GitHub-Event': 'push',
         'X-Hub-Signature-256': signature,
-        'User-Agent': 'GitHub-Hookshot/test',
-        'X-GitHub-Delivery': 'test-' + str(int(time.time()))
+        'X-GitHub-Delivery': f'test-{RUN_ID}'
     }
     
-    print(f"   Sending webhook to: {WEBHOOK_ENDPOINT}")
-    print(f"   Event type: push")
-    print(f"   Repository: test-user/test-repo")
-    print(f"   Commits: 1")
+    logger.info("   Sending webhook to: %s", WEBHOOK_ENDPOINT)
+    logger.info("   Event type: push")
+    logger.info("   Repository: test-user/test-repo")
+    logger.info("   Commits: 1")
     
     try:
-        response = requests.post(WEBHOOK_ENDPOINT, data=payload_str, headers=headers, timeout=30)
+        response = await client.post(WEBHOOK_ENDPOINT, content=payload_bytes, headers=headers)
         
-        print(f"\n   Response status: {response.status_code}")
+        logger.info("\n   Response status: %s", response.status_code)
         
         if response.status_code == 200:
-            print("✅ Webhook request successful!")
-            try:
-                response_data = response.json()
-                print(f"   Response data: {json.dumps(response_data, indent=2)}")
-            except:
-                print(f"   Response text: {response.text}")
+            logger.info("✅ Webhook request successful!")
+            # Pretty-printing the body is only worth it when the line will be shown
+            if logger.isEnabledFor(logging.INFO):
+                try:
+                    response_data = orjson.loads(response.content)
+                    logger.info("   Response data: %s", orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode())
+                except:
+                    logger.info("   Response text: %s", response.text)
             return True
         elif response.status_code == 401:
-            print("❌ Webhook signature verification failed")
-            print("   Check that GITHUB_WEBHOOK_SECRET matches the secret used in your Edge Function")
+            logger.info("❌ Webhook signature verification failed")
+            logger.info("   Check that GITHUB_WEBHOOK_SECRET matches the secret used in your Edge Function")
             return False
         else:
-            print(f"❌ Webhook request failed: {response.status_code}")
-            print(f"   Response: {response.text}")
+            logger.info("❌ Webhook request failed: %s", response.status_code)
+            logger.info("   Response: %s", response.text)
             return False
             
     except Exception as e:
-        print(f"❌ Error testing incoming webhook: {e}")
+        logger.info("❌ Error testing incoming webhook: %s", e)
         return False
 
-def test_webhook_with_different_events():
+async def run_webhook_with_different_events(client):
     """Test webhook with different GitHub event types"""
-    print("\n🔄 Testing Different GitHub Event Types")
-    print("-" * 45)
+    logger.info("\n🔄 Testing Different GitHub Event Types")
+    logger.info("-" * 45)
     
-    events = [
-        {
-            "event_type": "issues",
-            "payload": {
-                "action": "opened",
-                "issue": {
-                    "number": 42,
-                    "title": "Test Issue from Webhook Integration",
-                    "html_url": "https://github.com/test-user/test-repo/issues/42",
-                    "state": "open",
-                    "user": {
-                        "login": "test-user"
-                    }
-                },
-                "repository": {
-                    "name": "test-repo",
-                    "full_name": "test-user/test-repo",
-                    "html_url": "https://github.com/test-user/test-repo"
-                },
-                "sender": {
-                    "login": "test-user"
-                }
-            }
-        },
-        {
-            "event_type": "pull_request",
-            "payload": {
-                "action": "opened",
-                "pull_request": {
-                    "number": 123,
-                    "title": "Test PR from Webhook Integration",
-                    "html_url": "https://github.com/test-user/test-repo/pull/123",
-                    "state": "open",
-                    "user": {
-                        "login": "test-user"
-                    }
-                },
-                "repository": {
-                    "name": "test-repo",
-                    "full_name": "test-user/test-repo",
-                    "html_url": "https://github.com/test-user/test-repo"
-                },
-                "sender": {
-                    "login": "test-user"
-                }
-            }
+    prepared = []
+    for i, event in enumerate(EVENTS):
+        headers = {
+            'X-GitHub-Event': event["event_type"],
+            'X-Hub-Signature-256': event["signature"],
+            'X-GitHub-Delivery': f'test-{event["event_type"]}-{RUN_ID}-{i}'
         }
-    ]
+        prepared.append((headers, event["payload_bytes"]))
+    
+    # Events are independent, post them all at once over the shared client
+    responses = await asyncio.gather(
+        *(client.post(WEBHOOK_ENDPOINT, content=payload_bytes, headers=headers) for headers, payload_bytes in prepared),
+        return_exceptions=True
+    )
     
     success_count = 0
     
-    for event in events:
-        print(f"\n   Testing {event['event_type']} event...")
-        
-        payload_str = json.dumps(event["payload"])
-        signature = create_github_signature(payload_str, GITHUB_WEBHOOK_SECRET)
-        
-        headers = {
-            'Content-Type': 'application/json',
-            'X-GitHub-Event': event["event_type"],
-            'X-Hub-Signature-256': signature,
-            'User-Agent': 'GitHub-Hookshot/test',
-            'X-GitHub-Delivery': f'test-{event["event_type"]}-{int(time.time())}'
-        }
+    for event, response in zip(EVENTS, responses):
+        logger.info("\n   Testing %s event...", event['event_type'])
         
         try:
-            response = requests.post(WEBHOOK_ENDPOINT, data=payload_str, headers=headers, timeout=30)
+            if isinstance(response, Exception):
+                raise response
             
             if response.status_code == 200:
-                print(f"   ✅ {event['event_type']} event processed successfully")
+                logger.info("   ✅ %s event processed successfully", event['event_type'])
                 success_count += 1
             else:
-                print(f"   ❌ {event['event_type']} event failed: {response.status_code}")
+                logger.info("   ❌ %s event failed: %s", event['event_type'], response.status_code)
                 
         except Exception as e:
-            print(f"   ❌ {event['event_type']} event error: {e}")
+            logger.info("   ❌ %s event error: %s", event['event_type'], e)
     
-    print(f"\n   Summary: {success_count}/{len(events)} events processed successfully")
-    return success_count == len(events)
+    logger.info("\n   Summary: %s/%s events processed successfully", success_count, len(EVENTS))
+    return success_count == len(EVENTS)
 
 def check_configuration():
     """Check if required configuration is set"""
-    print("🔄 Checking Configuration")
-    print("-" * 30)
+    logger.info("🔄 Checking Configuration")
+    logger.info("-" * 30)
     
     issues = []
     
     if SUPABASE_URL == 'https://your-project-ref.supabase.co':
         issues.append("SUPABASE_URL not configured")
-        print("❌ SUPABASE_URL not configured")
-        print("   Set with: export SUPABASE_URL=https://your-actual-project-ref.supabase.co")
+        logger.info("❌ SUPABASE_URL not configured")
+        logger.info("   Set with: export SUPABASE_URL=https://your-actual-project-ref.supabase.co")
     else:
-        print("✅ SUPABASE_URL configured")
-        print(f"   URL: {SUPABASE_URL}")
+        logger.info("✅ SUPABASE_URL configured")
+        logger.info("   URL: %s", SUPABASE_URL)
     
     if GITHUB_WEBHOOK_SECRET == 'your-webhook-secret':
         issues.append("GITHUB_WEBHOOK_SECRET not configured")
-        print("❌ GITHUB_WEBHOOK_SECRET not configured")
-        print("   Set with: export GITHUB_WEBHOOK_SECRET=your_actual_webhook_secret")
+        logger.info("❌ GITHUB_WEBHOOK_SECRET not configured")
+        logger.info("   Set with: export GITHUB_WEBHOOK_SECRET=your_actual_webhook_secret")
     else:
-        print("✅ GITHUB_WEBHOOK_SECRET configured")
-        print("   Secret: " + "*" * min(len(GITHUB_WEBHOOK_SECRET), 20) + "...")
+        logger.info("✅ GITHUB_WEBHOOK_SECRET configured")
+        logger.info("   Secret: [REDACTED]")
     
     if issues:
-        print(f"\n⚠️ Configuration issues found: {len(issues)}")
+        logger.info("\n⚠️ Configuration issues found: %s", len(issues))
         return False
     else:
-        print("\n✅ All configuration looks good!")
+        logger.info("\n✅ All configuration looks good!")
         return True
 
 def show_setup_instructions():
     """Show setup instructions for webhook integration"""
-    print("\n📋 Setup Instructions")
-    print("=" * 50)
+    logger.info("\n📋 Setup Instructions")
+    logger.info("=" * 50)
     
-    print(f"""
+    logger.info("""
 1. 🚀 Deploy the Edge Function:
    supabase functions deploy github-webhook --no-verify-jwt
 
@@ -260,47 +282,58 @@ def show_setup_instructions():
    supabase secrets set GITHUB_TOKEN=github_pat_your_token_here
 
 3. 🔗 Configure GitHub webhook in your repository:
-   URL: {WEBHOOK_ENDPOINT}
+   URL: %s
    Content-Type: application/json
    Events: push, pull_request, issues
    Secret: (same as GITHUB_WEBHOOK_SECRET above)
 
 4. 🧪 Set environment variables for testing:
-   export SUPABASE_URL={SUPABASE_URL}
+   export SUPABASE_URL=%s
    export GITHUB_WEBHOOK_SECRET=your_webhook_secret_here
 
 5. 📊 Apply database migrations:
    supabase db push
-""")
+""", WEBHOOK_ENDPOINT, SUPABASE_URL)
 
-def main():
+async def main():
     """Run webhook tests"""
-    print("🪝 Simple Webhook Integration Test")
-    print("=" * 50)
-    
+    progress = setup_progress(logger)
+    try:
+        logger.info("🪝 Simple Webhook Integration Test")
+        logger.info("=" * 50)
+        return await run_tests(progress)
+    finally:
+        progress.flush()
+
+async def run_tests(progress):
+    """Run the webhook checks, queueing progress output until the summary"""
     # Check configuration
     config_ok = check_configuration()
     
     if not config_ok:
         show_setup_instructions()
-        print("\n❌ Please fix configuration issues before testing")
-        return False
-    
-    # Test deployment
-    deployment_ok = test_edge_function_deployment()
-    
-    if not deployment_ok:
-        print("\n❌ Edge Function not accessible. Please deploy first.")
-        show_setup_instructions()
+        logger.info("\n❌ Please fix configuration issues before testing")
         return False
     
-    # Test basic webhook
-    webhook_ok = test_incoming_webhook()
-    
-    # Test different event types
-    events_ok = test_webhook_with_different_events()
+    # One client for the whole run, requests to the Edge Function share a connection
+    transport = httpx.AsyncHTTPTransport(http2=True, retries=3)
+    async with httpx.AsyncClient(transport=transport, headers=BASE_HEADERS, timeout=30) as client:
+        # Test deployment
+        deployment_ok = await check_edge_function_deployment(client)
+        
+        if not deployment_ok:
+            logger.info("\n❌ Edge Function not accessible. Please deploy first.")
+            show_setup_instructions()
+            return False
+        
+        # Test basic webhook
+        webhook_ok = await run_incoming_webhook(client)
+        
+        # Test different event types
+        events_ok = await run_webhook_with_different_events(client)
     
     # Summary
+    progress.flush()
     print("\n" + "=" * 50)
     print("🎉 Test Summary")
     print("-" * 20)
@@ -321,5 +354,5 @@ def main():
     return all([config_ok, deployment_ok, webhook_ok, events_ok])
 
 if __name__ == "__main__":
-    success = main()
+    success = asyncio.run(main())
     sys.exit(0 if success else 1) 
\ No newline at end of file
@@ -0,0 +1,17 @@
+-- Table existence check for connection test scripts
+-- Lets a client verify several tables in one RPC call instead of one request per table
+
+CREATE OR REPLACE FUNCTION check_tables(names text[])
+RETURNS TABLE(table_name text, present boolean)
+LANGUAGE sql
+STABLE
+AS $$
+  -- information_schema only lists tables the calling role can access
+  SELECT n, EXISTS (
+    SELECT 1
+    FROM information_schema.tables t
+    WHERE t.table_schema = 'public'
+      AND t.table_name = n
+  )
+  FROM unnest(names) AS n;
+$$;
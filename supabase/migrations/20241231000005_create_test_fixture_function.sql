@@ -0,0 +1,45 @@
+-- Test fixture for the webhook integration script
+-- Creates a company, position and candidate in one RPC call and one transaction
+
+CREATE OR REPLACE FUNCTION create_test_fixture(
+  company_name text,
+  position_title text,
+  candidate jsonb
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  new_company_id uuid;
+  new_position_id uuid;
+  new_candidate_id uuid;
+BEGIN
+  -- Company names are unique, reuse the test company on repeated runs
+  INSERT INTO companies (name)
+  VALUES (company_name)
+  ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+  RETURNING id INTO new_company_id;
+
+  INSERT INTO positions (company_id, title)
+  VALUES (new_company_id, position_title)
+  RETURNING id INTO new_position_id;
+
+  -- The candidate insert fires the outgoing webhook trigger
+  INSERT INTO candidates (position_id, first_name, last_name, email, phone, source_url)
+  VALUES (
+    new_position_id,
+    candidate->>'first_name',
+    candidate->>'last_name',
+    candidate->>'email',
+    candidate->>'phone',
+    candidate->>'source_url'
+  )
+  RETURNING id INTO new_candidate_id;
+
+  RETURN jsonb_build_object(
+    'company_id', new_company_id,
+    'position_id', new_position_id,
+    'candidate_id', new_candidate_id
+  );
+END;
+$$;
@@ -0,0 +1,25 @@
+-- Webhook artifacts for the integration test script
+-- Returns the latest push log for a repository and the stored commit in one RPC call
+
+CREATE OR REPLACE FUNCTION get_test_artifacts(sha text, repo text)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT jsonb_build_object(
+    'log', (
+      SELECT to_jsonb(l)
+      FROM github_webhook_logs l
+      WHERE l.event_type = 'push'
+        AND l.repository_name = repo
+      ORDER BY l.created_at DESC
+      LIMIT 1
+    ),
+    'commit', (
+      SELECT to_jsonb(c)
+      FROM github_commits c
+      WHERE c.commit_sha = sha
+      LIMIT 1
+    )
+  );
+$$;
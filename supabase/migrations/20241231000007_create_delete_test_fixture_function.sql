@@ -0,0 +1,23 @@
+-- Cleanup for the webhook integration test fixture
+-- Removes what create_test_fixture inserted, in one RPC call and one transaction
+
+CREATE OR REPLACE FUNCTION delete_test_fixture(ids jsonb)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Outgoing webhook calls only reference the candidate, they do not cascade
+  DELETE FROM github_api_calls
+  WHERE triggered_by_table = 'candidates'
+    AND triggered_by_id = (ids->>'candidate_id')::uuid;
+
+  -- Deleting the position cascades to its candidates
+  DELETE FROM positions
+  WHERE id = (ids->>'position_id')::uuid;
+
+  -- The company is shared between runs, drop it once nothing uses it
+  DELETE FROM companies c
+  WHERE c.id = (ids->>'company_id')::uuid
+    AND NOT EXISTS (SELECT 1 FROM positions p WHERE p.company_id = c.id);
+END;
+$$;
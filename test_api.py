@@ -1,9 +1,17 @@
+import asyncio
 import hashlib
+import hmac
 from unittest.mock import Mock, patch
 
 import pytest
+from fastapi.testclient import TestClient
 
+from api.index import app
 from api.scraper import JobScraper
+from api.webhooks.handlers import verify_github_signature, verify_vercel_signature
+
+WEBHOOK_SECRET = b"test_secret"
+WEBHOOK_BODY = b'{"type": "deployment.succeeded"}'
 
 
 class TestJobScraper:
@@ -16,7 +24,8 @@ class TestJobScraper:
         assert len(expected_hash) == 64
         assert expected_hash == hashlib.sha256(phone.encode()).hexdigest()
 
-    def test_domain_extraction(self):
+    @patch("api.scraper.create_client")
+    def test_domain_extraction(self, mock_supabase):
         """Test URL domain extraction for allowed_domains"""
         scraper = JobScraper("", "", "")
 
@@ -27,6 +36,9 @@ class TestJobScraper:
                 "https://hiring.tech-company.com/positions",
                 "hiring.tech-company.com",
             ),
+            ("https://jobs.example.com?lang=cs", "jobs.example.com"),
+            ("//jobs.example.com/login", "jobs.example.com"),
+            ("portal.cz/login?next=https://evil.com", ""),
         ]
 
         for url, expected_domain in test_cases:
@@ -47,32 +59,126 @@ class TestJobScraper:
         ]
 
         (
-            mock_client.table.return_value.select.return_value.eq.return_value.execute.return_value.data
+            mock_client.table.return_value.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value.data
         ) = existing_candidates
 
         scraper = JobScraper("test_url", "test_key", "test_browser_key")
 
-        # This would normally be async, but we're testing the logic
-        result = scraper._get_existing_phone_hashes("position_id_123")
+        result = asyncio.run(scraper._get_existing_phone_hashes("position_id_123"))
+
+        assert result == {"abc123", "def456", "ghi789"}
+
+    @patch("api.scraper.create_client")
+    def test_store_candidates_skips_duplicate_phones(self, mock_supabase):
+        """Test that repeated phones in one result are not sent to Supabase"""
+        mock_client = Mock()
+        mock_supabase.return_value = mock_client
+        upsert = mock_client.table.return_value.upsert
+        upsert.return_value.execute.return_value.data = [{}, {}, {}]
+
+        scraper = JobScraper("test_url", "test_key", "test_browser_key")
+
+        candidates = [
+            {"first_name": "Jan", "phone": "+420111111111"},
+            {"first_name": "Jan", "phone": "+420111111111"},
+            {"first_name": "Eva", "phone": "+420222222222"},
+            {"first_name": "Petr"},
+        ]
+        result = asyncio.run(
+            scraper._store_candidates("position_id_123", candidates, "https://x.cz")
+        )
 
-        expected_hashes = ["abc123", "def456", "ghi789"]
-        assert result == expected_hashes
+        records = upsert.call_args.args[0]
+        assert [r["first_name"] for r in records] == ["Jan", "Eva", "Petr"]
+        assert result == {"inserted": 3, "skipped": 1}
+
+    @patch("api.scraper.create_client")
+    def test_concurrent_ensure_position_inserts_once(self, mock_supabase):
+        """Test that concurrent lookups of a new position create one row"""
+        mock_client = Mock()
+        mock_supabase.return_value = mock_client
+        table = mock_client.table.return_value
+        lookup = table.select.return_value.eq.return_value.eq.return_value
+        lookup.execute.return_value.data = []
+        insert = table.insert
+        insert.return_value.execute.return_value.data = [{"id": "position_id_123"}]
+
+        scraper = JobScraper("test_url", "test_key", "test_browser_key")
+
+        async def ensure_twice():
+            return await asyncio.gather(
+                scraper._ensure_position("company_id_123", "Developer"),
+                scraper._ensure_position("company_id_123", "Developer"),
+            )
+
+        assert asyncio.run(ensure_twice()) == ["position_id_123", "position_id_123"]
+        assert insert.call_count == 1
 
     def test_task_prompt_generation(self):
         """Test that the scraping task prompt is properly formatted"""
-        scraper = JobScraper("", "", "")
-
         portal_url = "https://jobs.example.com"
         position_name = "Senior Developer"
 
-        task = scraper._build_scraping_task(portal_url, position_name)
+        task = JobScraper._build_scraping_task(portal_url, position_name)
 
         assert portal_url in task
         assert position_name in task
-        assert "sha256" in task
-        assert "skip_hashes_csv" in task
+        assert "skip_hashes_csv" not in task
         assert "structured_output_json" in task
 
 
+class TestWebhookSignatures:
+    def test_github_signature(self):
+        """Test GitHub signature verification against the secret"""
+        digest = hmac.new(WEBHOOK_SECRET, WEBHOOK_BODY, "sha256").hexdigest()
+
+        assert verify_github_signature(WEBHOOK_BODY, f"sha256={digest}", WEBHOOK_SECRET)
+        assert not verify_github_signature(WEBHOOK_BODY, "", WEBHOOK_SECRET)
+        assert not verify_github_signature(WEBHOOK_BODY, digest, WEBHOOK_SECRET)
+        assert not verify_github_signature(WEBHOOK_BODY, "sha256=zz", WEBHOOK_SECRET)
+        assert verify_github_signature(WEBHOOK_BODY, "", b"")
+
+    def test_vercel_signature(self):
+        """Test Vercel signature verification against the secret"""
+        digest = hmac.new(WEBHOOK_SECRET, WEBHOOK_BODY, "sha1").hexdigest()
+
+        assert verify_vercel_signature(WEBHOOK_BODY, digest, WEBHOOK_SECRET)
+        assert not verify_vercel_signature(WEBHOOK_BODY, "", WEBHOOK_SECRET)
+        assert not verify_vercel_signature(WEBHOOK_BODY, "not-hex", WEBHOOK_SECRET)
+        assert verify_vercel_signature(WEBHOOK_BODY, "", b"")
+
+    @patch("api.webhooks.handlers.GITHUB_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    def test_github_endpoint_signature(self):
+        """Test that the GitHub endpoint rejects bad signatures with 401"""
+        client = TestClient(app)
+        digest = hmac.new(WEBHOOK_SECRET, WEBHOOK_BODY, "sha256").hexdigest()
+
+        for signature, status in [
+            (f"sha256={digest}", 200),
+            ("", 401),
+            ("sha256=zz", 401),
+        ]:
+            response = client.post(
+                "/webhooks/github",
+                content=WEBHOOK_BODY,
+                headers={"X-Hub-Signature-256": signature, "X-GitHub-Event": "ping"},
+            )
+            assert response.status_code == status
+
+    @patch("api.webhooks.handlers.VERCEL_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    def test_vercel_endpoint_signature(self):
+        """Test that the Vercel endpoint rejects bad signatures with 401"""
+        client = TestClient(app)
+        digest = hmac.new(WEBHOOK_SECRET, WEBHOOK_BODY, "sha1").hexdigest()
+
+        for signature, status in [(digest, 200), ("", 401), ("not-hex", 401)]:
+            response = client.post(
+                "/webhooks/vercel",
+                content=WEBHOOK_BODY,
+                headers={"X-Vercel-Signature": signature},
+            )
+            assert response.status_code == status
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
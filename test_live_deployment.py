@@ -3,10 +3,62 @@
 Test live deployment webhook integration
 """
 
-import requests
+import asyncio
+import httpx
 import json
+import logging
 
-def test_deployment_endpoints():
+from script_output import emit, note, setup_progress
+
+logger = logging.getLogger(__name__)
+
+async def probe_endpoint(client, base_url, endpoint):
+    """Probe a single endpoint, returning (ok, progress lines)"""
+    url = f"{base_url}{endpoint}"
+    lines = []
+    try:
+        if endpoint.startswith("/webhooks/"):
+            # Unsigned empty POST, any answer but 404/405 means the route exists
+            # (GET hits the catch-all and every path answers HEAD with 405)
+            response = await client.post(url, json={})
+            if response.status_code not in (404, 405):
+                note(lines, "✅ %s - Available (status %s)", endpoint, response.status_code)
+                return True, lines
+            else:
+                note(lines, "❌ %s - Status: %s", endpoint, response.status_code)
+                return False, lines
+        else:
+            # Test with GET
+            response = await client.get(url)
+            if response.status_code == 200:
+                note(lines, "✅ %s - OK", endpoint)
+                return True, lines
+            else:
+                note(lines, "❌ %s - Status: %s", endpoint, response.status_code)
+                return False, lines
+                
+    except Exception as e:
+        note(lines, "❌ %s - Error: %s", endpoint, e)
+        return False, lines
+
+async def probe_root(client, base_url):
+    """Probe the root endpoint, returning (ok, endpoints advertised by the deployment)"""
+    try:
+        response = await client.get(f"{base_url}/")
+        if response.status_code == 200:
+            logger.info("✅ / - OK")
+            endpoints_list = response.json().get('endpoints', {})
+            logger.info("   Available endpoints: %s", list(endpoints_list.keys()))
+            return True, endpoints_list
+        else:
+            logger.info("❌ / - Status: %s", response.status_code)
+            return False, {}
+            
+    except Exception as e:
+        logger.info("❌ / - Error: %s", e)
+        return False, {}
+
+async def check_deployment_endpoints():
     """Test if deployment is live and has webhook endpoints"""
     
     # You'll need to replace this with your actual Vercel URL after deployment
@@ -16,47 +68,43 @@ def test_deployment_endpoints():
         print("❌ No URL provided")
         return False
         
-    print(f"\n🔄 Testing: {base_url}")
-    print("-" * 50)
-    
-    endpoints = [
-        "/",
-        "/api/health",
-        "/webhooks/github", 
-        "/webhooks/vercel"
-    ]
-    
-    results = {}
-    
-    for endpoint in endpoints:
-        url = f"{base_url}{endpoint}"
-        try:
-            if endpoint.startswith("/webhooks/"):
-                # Test with GET (should return 405)
-                response = requests.get(url, timeout=10)
-                if response.status_code == 405:
-                    print(f"✅ {endpoint} - Available (405 Method Not Allowed expected)")
-                    results[endpoint] = True
-                else:
-                    print(f"❌ {endpoint} - Status: {response.status_code}")
-                    results[endpoint] = False
-            else:
-                # Test with GET
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    print(f"✅ {endpoint} - OK")
-                    if endpoint == "/":
-                        data = response.json()
-                        endpoints_list = data.get('endpoints', {})
-                        print(f"   Available endpoints: {list(endpoints_list.keys())}")
-                    results[endpoint] = True
-                else:
-                    print(f"❌ {endpoint} - Status: {response.status_code}")
-                    results[endpoint] = False
-                    
-        except Exception as e:
-            print(f"❌ {endpoint} - Error: {e}")
-            results[endpoint] = False
+    progress = setup_progress(logger)
+    try:
+        logger.info("\n🔄 Testing: %s", base_url)
+        logger.info("-" * 50)
+        
+        endpoints = [
+            "/",
+            "/api/health",
+            "/webhooks/github", 
+            "/webhooks/vercel"
+        ]
+        
+        # All endpoints live on the same host, probe them over one client
+        async with httpx.AsyncClient(http2=True, timeout=10) as client:
+            root_ok, endpoints_list = await probe_root(client, base_url)
+            results = {"/": root_ok}
+            
+            # The deployment lists its routes, skip anything it does not serve
+            remaining = [
+                e for e in endpoints[1:] if not endpoints_list or e in endpoints_list
+            ]
+            probed = await asyncio.gather(
+                *(probe_endpoint(client, base_url, endpoint) for endpoint in remaining)
+            )
+        outcomes = dict(zip(remaining, probed))
+        
+        # Report in endpoint order, whatever order the probes finished in
+        for endpoint in endpoints[1:]:
+            if endpoint not in outcomes:
+                logger.info("⏭️ %s - Skipped, not listed by /", endpoint)
+                continue
+            ok, lines = outcomes[endpoint]
+            emit(logger, lines)
+            results[endpoint] = ok
+    finally:
+        # Write the progress even if probing was interrupted
+        progress.flush()
     
     success_count = sum(results.values())
     total_count = len(results)
@@ -74,4 +122,4 @@ def test_deployment_endpoints():
         return False
 
 if __name__ == "__main__":
-    test_deployment_endpoints()
+    asyncio.run(check_deployment_endpoints())
@@ -30,18 +30,16 @@ def test_connection():
         print("🔄 Testing Supabase connection...")
         print(f"📡 URL: {url}")
 
-        # Try to query public schema
-        supabase.rpc("version").execute()
+        # One round-trip both proves the connection and checks our tables
+        tables_to_check = ["companies", "positions", "candidates"]
+        result = supabase.rpc("check_tables", {"names": tables_to_check}).execute()
         print("✅ Connection successful!")
 
-        # Check if our tables exist
-        tables_to_check = ["companies", "positions", "candidates"]
-        for table in tables_to_check:
-            try:
-                supabase.table(table).select("*").limit(0).execute()
-                print(f"✅ Table '{table}' exists and is accessible")
-            except Exception as e:
-                print(f"⚠️  Table '{table}' not found or not accessible: {e}")
+        for row in result.data:
+            if row["present"]:
+                print(f"✅ Table '{row['table_name']}' exists and is accessible")
+            else:
+                print(f"⚠️  Table '{row['table_name']}' not found or not accessible")
 
         return True
 
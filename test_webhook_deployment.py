@@ -4,40 +4,169 @@ Test script for GitHub/Vercel webhook deployment integration
 """
 
 import os
-import json
+import logging
 import time
 import hmac
-import hashlib
-import requests
+import asyncio
+import httpx
+import orjson
 from datetime import datetime
+from urllib.parse import urlparse
+
+from script_output import emit, note, setup_progress
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL', 'https://jobportal-connector.vercel.app')
 GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', 'test-secret-123')
 VERCEL_WEBHOOK_SECRET = os.getenv('VERCEL_WEBHOOK_SECRET', 'test-vercel-secret-456')
 
-def create_github_signature(payload: str, secret: str) -> str:
-    """Create GitHub webhook signature"""
-    signature = hmac.new(
-        secret.encode('utf-8'),
-        payload.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
-    return f"sha256={signature}"
+# Shared client settings, webhook POSTs override the User-Agent where it matters
+CLIENT_HEADERS = {'User-Agent': 'webhook-test/1.0'}
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=10)
+
+# Responses are only printed, never read past this many bytes
+MAX_RESPONSE_BYTES = 65536
+
+# Secrets never change during a run, encode them once
+_GITHUB_SECRET_BYTES = GITHUB_WEBHOOK_SECRET.encode('utf-8')
+_VERCEL_SECRET_BYTES = VERCEL_WEBHOOK_SECRET.encode('utf-8')
 
-def create_vercel_signature(payload: str, secret: str) -> str:
-    """Create Vercel webhook signature"""
-    return hmac.new(
-        secret.encode('utf-8'),
-        payload.encode('utf-8'),
-        hashlib.sha1
-    ).hexdigest()
+# Static parts of the simulated events, built once at import
+_GITHUB_PAYLOAD_TEMPLATE = {
+    "ref": "refs/heads/main",
+    "before": "0000000000000000000000000000000000000000",
+    "after": "abc123def456789012345678901234567890abcd",
+    "repository": {
+        "id": 123456789,
+        "name": "jobportal_connector",
+        "full_name": "your-username/jobportal_connector",
+        "html_url": "https://github.com/your-username/jobportal_connector",
+        "description": "Job portal connector with webhook integration"
+    },
+    "pusher": {
+        "name": "testuser",
+        "email": "test@example.com"
+    },
+    "sender": {
+        "login": "testuser",
+        "avatar_url": "https://github.com/avatars/testuser"
+    },
+    "commits": [
+        {
+            "id": "abc123def456789012345678901234567890abcd",
+            "message": "feat: add webhook integration for deployment testing",
+            "timestamp": None,  # Set per request
+            "author": {
+                "name": "Test User",
+                "email": "test@example.com"
+            },
+            "added": ["api/webhooks/handlers.py"],
+            "modified": ["api/index.py", "vercel.json"],
+            "removed": []
+        }
+    ]
+}
+
+_VERCEL_PAYLOAD_TEMPLATE = {
+    "id": None,  # Set per request
+    "type": "deployment.ready",
+    "createdAt": None,
+    "data": {
+        "deployment": {
+            "id": None,
+            "url": "jobportal-connector-test.vercel.app",
+            "name": "jobportal-connector",
+            "target": "production", 
+            "state": "READY",
+            "type": "PRODUCTION",
+            "creator": {
+                "uid": "test-user-id",
+                "username": "testuser",
+                "email": "test@example.com"
+            },
+            "meta": {
+                "githubCommitSha": "abc123def456789012345678901234567890abcd",
+                "githubCommitMessage": "feat: add webhook integration for deployment testing",
+                "githubCommitAuthorName": "Test User", 
+                "githubCommitRef": "refs/heads/main",
+                "githubRepo": "jobportal_connector"
+            },
+            "createdAt": None,
+            "buildingAt": None,
+            "ready": None
+        },
+        "project": {
+            "id": "test-project-id",
+            "name": "jobportal-connector"
+        }
+    }
+}
 
-def test_webhook_endpoints():
-    """Test that webhook endpoints are accessible"""
-    print("🔄 Testing Webhook Endpoints Accessibility")
-    print("-" * 50)
+def create_github_signature(payload: bytes) -> str:
+    """Create GitHub webhook signature with the configured secret"""
+    return "sha256=" + hmac.digest(_GITHUB_SECRET_BYTES, payload, 'sha256').hex()
+
+def create_vercel_signature(payload: bytes) -> str:
+    """Create Vercel webhook signature with the configured secret"""
+    return hmac.digest(_VERCEL_SECRET_BYTES, payload, 'sha1').hex()
+
+async def request_capped(client, method, url, **kwargs):
+    """Send a request and read at most MAX_RESPONSE_BYTES of the body, returning (status, body)"""
+    async with client.stream(method, url, **kwargs) as response:
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body += chunk
+            if len(body) >= MAX_RESPONSE_BYTES:
+                break
+        return response.status_code, bytes(body[:MAX_RESPONSE_BYTES])
+
+async def target_reachable(url, timeout=2.0):
+    """Check that a TCP connection to the URL's host opens within timeout seconds"""
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(parsed.hostname, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    await writer.wait_closed()
+    return True
+
+async def probe_endpoint(client, endpoint):
+    """Probe a single endpoint, returning (ok, progress lines)"""
+    url = f"{WEBHOOK_BASE_URL}{endpoint}"
+    lines = []
+    note(lines, "   Testing: %s", endpoint)
     
+    try:
+        if endpoint in ["/webhooks/github", "/webhooks/vercel"]:
+            # Unsigned empty POST, any answer but 404/405 means the route exists
+            # (GET hits the catch-all and every path answers HEAD with 405)
+            response = await client.post(url, json={})
+            if response.status_code not in (404, 405):
+                note(lines, "   ✅ %s - Endpoint exists (status %s)", endpoint, response.status_code)
+                return True, lines
+            else:
+                note(lines, "   ⚠️ %s - Unexpected status: %s", endpoint, response.status_code)
+                return False, lines
+        else:
+            # Test with GET
+            response = await client.get(url)
+            if response.status_code == 200:
+                note(lines, "   ✅ %s - OK", endpoint)
+                return True, lines
+            else:
+                note(lines, "   ❌ %s - Status: %s", endpoint, response.status_code)
+                return False, lines
+                
+    except Exception as e:
+        note(lines, "   ❌ %s - Error: %s", endpoint, e)
+        return False, lines
+
+async def check_webhook_endpoints(client):
+    """Test that webhook endpoints are accessible, returning (results, progress lines)"""
     endpoints = [
         "/",
         "/api/health", 
@@ -45,81 +174,33 @@ def test_webhook_endpoints():
         "/webhooks/vercel"
     ]
     
-    results = {}
+    # The probes are independent, run them concurrently over the shared client
+    outcomes = await asyncio.gather(*(probe_endpoint(client, endpoint) for endpoint in endpoints))
     
-    for endpoint in endpoints:
-        url = f"{WEBHOOK_BASE_URL}{endpoint}"
-        print(f"   Testing: {endpoint}")
-        
-        try:
-            if endpoint in ["/webhooks/github", "/webhooks/vercel"]:
-                # Test with GET (should return 405 Method Not Allowed)
-                response = requests.get(url, timeout=10)
-                if response.status_code == 405:
-                    print(f"   ✅ {endpoint} - Endpoint exists (405 Method Not Allowed expected)")
-                    results[endpoint] = True
-                else:
-                    print(f"   ⚠️ {endpoint} - Unexpected status: {response.status_code}")
-                    results[endpoint] = False
-            else:
-                # Test with GET
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    print(f"   ✅ {endpoint} - OK")
-                    results[endpoint] = True
-                else:
-                    print(f"   ❌ {endpoint} - Status: {response.status_code}")
-                    results[endpoint] = False
-                    
-        except Exception as e:
-            print(f"   ❌ {endpoint} - Error: {e}")
-            results[endpoint] = False
+    # Collect the probe lines in endpoint order, whatever order they finished in
+    lines = []
+    note(lines, "\n🔄 Testing Webhook Endpoints Accessibility")
+    note(lines, "-" * 50)
+    results = {}
+    for endpoint, (ok, probe_lines) in zip(endpoints, outcomes):
+        lines.extend(probe_lines)
+        results[endpoint] = ok
     
-    return results
+    return results, lines
 
-def test_github_push_webhook():
-    """Test GitHub push webhook simulation"""
-    print("\n🔄 Testing GitHub Push Webhook")
-    print("-" * 40)
+async def run_github_push_webhook(client):
+    """Test GitHub push webhook simulation, returning (ok, progress lines)"""
+    lines = []
+    note(lines, "\n🔄 Testing GitHub Push Webhook")
+    note(lines, "-" * 40)
     
-    # Simulate a GitHub push event that would trigger deployment
-    test_payload = {
-        "ref": "refs/heads/main",
-        "before": "0000000000000000000000000000000000000000",
-        "after": "abc123def456789012345678901234567890abcd",
-        "repository": {
-            "id": 123456789,
-            "name": "jobportal_connector",
-            "full_name": "your-username/jobportal_connector",
-            "html_url": "https://github.com/your-username/jobportal_connector",
-            "description": "Job portal connector with webhook integration"
-        },
-        "pusher": {
-            "name": "testuser",
-            "email": "test@example.com"
-        },
-        "sender": {
-            "login": "testuser",
-            "avatar_url": "https://github.com/avatars/testuser"
-        },
-        "commits": [
-            {
-                "id": "abc123def456789012345678901234567890abcd",
-                "message": "feat: add webhook integration for deployment testing",
-                "timestamp": datetime.now().isoformat(),
-                "author": {
-                    "name": "Test User",
-                    "email": "test@example.com"
-                },
-                "added": ["api/webhooks/handlers.py"],
-                "modified": ["api/index.py", "vercel.json"],
-                "removed": []
-            }
-        ]
-    }
+    # Simulate a GitHub push event that would trigger deployment, only the
+    # commit timestamp changes between runs
+    commit = {**_GITHUB_PAYLOAD_TEMPLATE["commits"][0], "timestamp": datetime.now()}
+    test_payload = {**_GITHUB_PAYLOAD_TEMPLATE, "commits": [commit]}
     
-    payload_str = json.dumps(test_payload)
-    signature = create_github_signature(payload_str, GITHUB_WEBHOOK_SECRET)
+    payload_bytes = orjson.dumps(test_payload)
+    signature = create_github_signature(payload_bytes)
     
     headers = {
         'Content-Type': 'application/json',
@@ -130,75 +211,60 @@ def test_github_push_webhook():
     }
     
     webhook_url = f"{WEBHOOK_BASE_URL}/webhooks/github"
-    print(f"   Sending to: {webhook_url}")
-    print(f"   Event: push to main branch")
-    print(f"   Commits: {len(test_payload['commits'])}")
+    note(lines, "   Sending to: %s", webhook_url)
+    note(lines, "   Event: push to main branch")
+    note(lines, "   Commits: %s", len(test_payload['commits']))
     
     try:
-        response = requests.post(webhook_url, data=payload_str, headers=headers, timeout=30)
+        status_code, body = await request_capped(client, 'POST', webhook_url, content=payload_bytes, headers=headers, timeout=30)
         
-        print(f"\n   Response status: {response.status_code}")
+        note(lines, "\n   Response status: %s", status_code)
         
-        if response.status_code == 200:
-            print("   ✅ GitHub webhook processed successfully!")
-            try:
-                response_data = response.json()
-                print(f"   Response: {json.dumps(response_data, indent=2)}")
-            except:
-                print(f"   Response text: {response.text}")
-            return True
+        if status_code == 200:
+            note(lines, "   ✅ GitHub webhook processed successfully!")
+            # Pretty-printing the body is only worth it when the line will be shown
+            if logger.isEnabledFor(logging.INFO):
+                try:
+                    response_data = orjson.loads(body)
+                    note(lines, "   Response: %s", orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode())
+                except:
+                    note(lines, "   Response text: %s", body.decode(errors='replace'))
+            return True, lines
         else:
-            print(f"   ❌ GitHub webhook failed: {response.status_code}")
-            print(f"   Response: {response.text}")
-            return False
+            note(lines, "   ❌ GitHub webhook failed: %s", status_code)
+            note(lines, "   Response: %s", body.decode(errors='replace'))
+            return False, lines
             
     except Exception as e:
-        print(f"   ❌ Error testing GitHub webhook: {e}")
-        return False
+        note(lines, "   ❌ Error testing GitHub webhook: %s", e)
+        return False, lines
 
-def test_vercel_deployment_webhook():
-    """Test Vercel deployment webhook simulation"""
-    print("\n🔄 Testing Vercel Deployment Webhook")
-    print("-" * 45)
+async def run_vercel_deployment_webhook(client):
+    """Test Vercel deployment webhook simulation, returning (ok, progress lines)"""
+    lines = []
+    note(lines, "\n🔄 Testing Vercel Deployment Webhook")
+    note(lines, "-" * 45)
     
-    # Simulate a Vercel deployment event
+    # Simulate a Vercel deployment event, filling in the per-request ids and times.
+    # The clock is read once so every timestamp is relative to the same "now"
+    now_ms = int(time.time() * 1000)
+    now_s = now_ms // 1000
+    deployment = {
+        **_VERCEL_PAYLOAD_TEMPLATE["data"]["deployment"],
+        "id": f"dpl_test_{now_s}",
+        "createdAt": now_ms - 120000,  # 2 minutes ago
+        "buildingAt": now_ms - 60000,  # 1 minute ago
+        "ready": now_ms  # Now
+    }
     test_payload = {
-        "id": f"evt_test_{int(time.time())}",
-        "type": "deployment.ready",
-        "createdAt": int(time.time() * 1000),
-        "data": {
-            "deployment": {
-                "id": f"dpl_test_{int(time.time())}",
-                "url": "jobportal-connector-test.vercel.app",
-                "name": "jobportal-connector",
-                "target": "production", 
-                "state": "READY",
-                "type": "PRODUCTION",
-                "creator": {
-                    "uid": "test-user-id",
-                    "username": "testuser",
-                    "email": "test@example.com"
-                },
-                "meta": {
-                    "githubCommitSha": "abc123def456789012345678901234567890abcd",
-                    "githubCommitMessage": "feat: add webhook integration for deployment testing",
-                    "githubCommitAuthorName": "Test User", 
-                    "githubCommitRef": "refs/heads/main",
-                    "githubRepo": "jobportal_connector"
-                },
-                "createdAt": int(time.time() * 1000) - 120000,  # 2 minutes ago
-                "buildingAt": int(time.time() * 1000) - 60000,  # 1 minute ago  
-                "ready": int(time.time() * 1000)  # Now
-            },
-            "project": {
-                "id": "test-project-id",
-                "name": "jobportal-connector"
-            }
-        }
+        **_VERCEL_PAYLOAD_TEMPLATE,
+        "id": f"evt_test_{now_s}",
+        "createdAt": now_ms,
+        "data": {**_VERCEL_PAYLOAD_TEMPLATE["data"], "deployment": deployment}
     }
     
-    payload_str = json.dumps(test_payload)
-    signature = create_vercel_signature(payload_str, VERCEL_WEBHOOK_SECRET)
+    payload_bytes = orjson.dumps(test_payload)
+    signature = create_vercel_signature(payload_bytes)
     
     headers = {
         'Content-Type': 'application/json',
@@ -207,106 +273,120 @@ def test_vercel_deployment_webhook():
     }
     
     webhook_url = f"{WEBHOOK_BASE_URL}/webhooks/vercel"
-    print(f"   Sending to: {webhook_url}")
-    print(f"   Event: {test_payload['type']}")
-    print(f"   Deployment state: {test_payload['data']['deployment']['state']}")
-    print(f"   Project: {test_payload['data']['project']['name']}")
+    note(lines, "   Sending to: %s", webhook_url)
+    note(lines, "   Event: %s", test_payload['type'])
+    note(lines, "   Deployment state: %s", test_payload['data']['deployment']['state'])
+    note(lines, "   Project: %s", test_payload['data']['project']['name'])
     
     try:
-        response = requests.post(webhook_url, data=payload_str, headers=headers, timeout=30)
+        status_code, body = await request_capped(client, 'POST', webhook_url, content=payload_bytes, headers=headers, timeout=30)
         
-        print(f"\n   Response status: {response.status_code}")
+        note(lines, "\n   Response status: %s", status_code)
         
-        if response.status_code == 200:
-            print("   ✅ Vercel webhook processed successfully!")
-            try:
-                response_data = response.json()
-                print(f"   Response: {json.dumps(response_data, indent=2)}")
-            except:
-                print(f"   Response text: {response.text}")
-            return True
+        if status_code == 200:
+            note(lines, "   ✅ Vercel webhook processed successfully!")
+            # Pretty-printing the body is only worth it when the line will be shown
+            if logger.isEnabledFor(logging.INFO):
+                try:
+                    response_data = orjson.loads(body)
+                    note(lines, "   Response: %s", orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode())
+                except:
+                    note(lines, "   Response text: %s", body.decode(errors='replace'))
+            return True, lines
         else:
-            print(f"   ❌ Vercel webhook failed: {response.status_code}")
-            print(f"   Response: {response.text}")
-            return False
+            note(lines, "   ❌ Vercel webhook failed: %s", status_code)
+            note(lines, "   Response: %s", body.decode(errors='replace'))
+            return False, lines
             
     except Exception as e:
-        print(f"   ❌ Error testing Vercel webhook: {e}")
-        return False
+        note(lines, "   ❌ Error testing Vercel webhook: %s", e)
+        return False, lines
 
-def test_deployment_flow():
-    """Test the complete deployment flow"""
-    print("\n🔄 Testing Complete Deployment Flow")
-    print("-" * 45)
-    
-    print("   Simulating deployment sequence:")
-    print("   1. GitHub push → triggers Vercel deployment")
-    print("   2. Vercel starts building")
-    print("   3. Vercel deployment completes")
+def report_deployment_flow(github_success, vercel_success):
+    """Test the complete deployment flow from the GitHub and Vercel webhook results"""
+    logger.info("\n🔄 Testing Complete Deployment Flow")
+    logger.info("-" * 45)
     
-    # Test the sequence
-    github_success = test_github_push_webhook()
-    time.sleep(2)  # Simulate build time
-    vercel_success = test_vercel_deployment_webhook()
+    logger.info("   Simulating deployment sequence:")
+    logger.info("   1. GitHub push → triggers Vercel deployment")
+    logger.info("   2. Vercel starts building")
+    logger.info("   3. Vercel deployment completes")
     
     if github_success and vercel_success:
-        print("\n   ✅ Complete deployment flow tested successfully!")
+        logger.info("\n   ✅ Complete deployment flow tested successfully!")
         return True
     else:
-        print("\n   ❌ Deployment flow test failed")
+        logger.info("\n   ❌ Deployment flow test failed")
         return False
 
-def check_deployment_status():
-    """Check if the current deployment is accessible"""
-    print("\n🔄 Checking Current Deployment Status")
-    print("-" * 45)
+async def check_deployment_status(client):
+    """Check if the current deployment is accessible, returning (ok, progress lines)"""
+    lines = []
+    note(lines, "\n🔄 Checking Current Deployment Status")
+    note(lines, "-" * 45)
     
     try:
         health_url = f"{WEBHOOK_BASE_URL}/api/health"
-        response = requests.get(health_url, timeout=10)
+        # Fetch health and the root endpoint for webhook info together
+        (status_code, body), (root_status_code, root_body) = await asyncio.gather(
+            request_capped(client, 'GET', health_url),
+            request_capped(client, 'GET', WEBHOOK_BASE_URL)
+        )
         
-        if response.status_code == 200:
-            health_data = response.json()
-            print(f"   ✅ Deployment is live and healthy!")
-            print(f"   Status: {health_data.get('status', 'unknown')}")
-            print(f"   Service: {health_data.get('service', 'unknown')}")
+        if status_code == 200:
+            health_data = orjson.loads(body)
+            note(lines, "   ✅ Deployment is live and healthy!")
+            note(lines, "   Status: %s", health_data.get('status', 'unknown'))
+            note(lines, "   Service: %s", health_data.get('service', 'unknown'))
             
-            # Check root endpoint for webhook info
-            root_response = requests.get(WEBHOOK_BASE_URL, timeout=10)
-            if root_response.status_code == 200:
-                root_data = root_response.json()
+            if root_status_code == 200:
+                root_data = orjson.loads(root_body)
                 endpoints = root_data.get('endpoints', {})
-                print(f"   Available endpoints: {list(endpoints.keys())}")
+                note(lines, "   Available endpoints: %s", list(endpoints.keys()))
             
-            return True
+            return True, lines
         else:
-            print(f"   ❌ Deployment health check failed: {response.status_code}")
-            return False
+            note(lines, "   ❌ Deployment health check failed: %s", status_code)
+            return False, lines
             
     except Exception as e:
-        print(f"   ❌ Error checking deployment: {e}")
-        return False
+        note(lines, "   ❌ Error checking deployment: %s", e)
+        return False, lines
 
-def main():
+async def main():
     """Run the complete webhook deployment test suite"""
-    print("🚀 Webhook Deployment Test Suite")
-    print("=" * 60)
-    print(f"Target URL: {WEBHOOK_BASE_URL}")
-    print("=" * 60)
-    
-    # Test current deployment status
-    deployment_ok = check_deployment_status()
-    
-    # Test webhook endpoints
-    endpoints_ok = test_webhook_endpoints()
-    endpoints_success = all(endpoints_ok.values())
-    
-    # Test webhook functionality
-    github_ok = test_github_push_webhook()
-    vercel_ok = test_vercel_deployment_webhook()
-    
-    # Test complete flow
-    flow_ok = test_deployment_flow()
+    progress = setup_progress(logger)
+    try:
+        logger.info("🚀 Webhook Deployment Test Suite")
+        logger.info("=" * 60)
+        logger.info("Target URL: %s", WEBHOOK_BASE_URL)
+        logger.info("=" * 60)
+        
+        # A quick TCP check up front, instead of every test waiting out its HTTP timeout
+        if not await target_reachable(WEBHOOK_BASE_URL):
+            logger.warning("⏭  Target unreachable, skipping remote tests")
+            return
+        
+        # One client for the whole suite, every request goes to the same host
+        async with httpx.AsyncClient(http2=True, headers=CLIENT_HEADERS, limits=CLIENT_LIMITS, timeout=10) as client:
+            # None of the checks depend on each other's results, run them together
+            outcomes = await asyncio.gather(
+                check_deployment_status(client),
+                check_webhook_endpoints(client),
+                run_github_push_webhook(client),
+                run_vercel_deployment_webhook(client)
+            )
+        
+        # Each check collected its own lines, emit the sections in a fixed order
+        for _, lines in outcomes:
+            emit(logger, lines)
+        (deployment_ok, _), (endpoints_ok, _), (github_ok, _), (vercel_ok, _) = outcomes
+        endpoints_success = all(endpoints_ok.values())
+        
+        # The flow is the two webhooks together, reuse their results instead of resending
+        flow_ok = report_deployment_flow(github_ok, vercel_ok)
+    finally:
+        progress.flush()
     
     # Summary
     print("\n" + "=" * 60)
@@ -344,4 +424,4 @@ def main():
             print("- Check the API routing configuration")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
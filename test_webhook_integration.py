@@ -5,40 +5,78 @@ Tests both incoming and outgoing webhook functionality
 """
 
 import os
-import json
-import time
+import logging
 import hmac
-import hashlib
-import requests
+import asyncio
+import httpx
+import orjson
 from datetime import datetime
 from supabase import create_client, Client
 
+from script_output import setup_progress
+
+logger = logging.getLogger(__name__)
+
 # Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL', 'https://your-project-ref.supabase.co')
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY', 'your-service-role-key')
 GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', 'your-webhook-secret')
 WEBHOOK_ENDPOINT = f"{SUPABASE_URL}/functions/v1/github-webhook"
+_GITHUB_SECRET_BYTES = GITHUB_WEBHOOK_SECRET.encode('utf-8')
+
+# Shared client settings, webhook POSTs override the User-Agent where it matters
+CLIENT_HEADERS = {'User-Agent': 'webhook-test/1.0'}
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=10)
+
+CONFIG_ITEMS = [
+    ('SUPABASE_URL', SUPABASE_URL),
+    ('SUPABASE_SERVICE_ROLE_KEY', SUPABASE_KEY),
+    ('GITHUB_WEBHOOK_SECRET', GITHUB_WEBHOOK_SECRET)
+]
+
+# Created on first use, so unconfigured runs never try to reach a placeholder project
+_supabase: Client = None
+
+def is_configured(value: str) -> bool:
+    """Check that a setting was replaced with a real value (defaults contain 'your-')"""
+    return bool(value) and 'your-' not in value
+
+def has_valid_config() -> bool:
+    """Check that every required setting is configured"""
+    return all(is_configured(value) for _, value in CONFIG_ITEMS)
+
+def get_supabase() -> Client:
+    """Return the shared Supabase client, creating it on first use"""
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        logger.info("✅ Supabase client initialized")
+    return _supabase
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✅ Supabase client initialized")
-except Exception as e:
-    print(f"❌ Failed to initialize Supabase client: {e}")
-    exit(1)
+def create_github_signature(payload: bytes) -> str:
+    """Create GitHub webhook signature with the configured secret"""
+    return "sha256=" + hmac.digest(_GITHUB_SECRET_BYTES, payload, 'sha256').hex()
 
-def create_github_signature(payload: str, secret: str) -> str:
-    """Create GitHub webhook signature"""
-    signature = hmac.new(
-        secret.encode('utf-8'),
-        payload.encode('utf-8'),
-        hashlib.sha256
-    ).hexdigest()
-    return f"sha256={signature}"
+async def wait_for_row(query_fn, timeout=8.0, initial=0.1, ready=lambda result: bool(result.data)):
+    """Poll a Supabase query with exponential backoff until ready(result) holds or times out"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = initial
+    while True:
+        result = await asyncio.to_thread(query_fn)
+        remaining = deadline - loop.time()
+        if ready(result) or remaining <= 0:
+            return result
+        await asyncio.sleep(min(delay, remaining))
+        delay *= 2
 
-def test_incoming_webhook():
+async def run_incoming_webhook(client):
     """Test incoming webhook from GitHub to Supabase"""
-    print("\n🔄 Testing Incoming Webhook (GitHub → Supabase)")
+    logger.info("\n🔄 Testing Incoming Webhook (GitHub → Supabase)")
+    
+    if not has_valid_config():
+        logger.info("⏭  Skipped, configuration incomplete")
+        return
     
     # Sample GitHub push event payload
     test_payload = {
@@ -65,8 +103,8 @@ def test_incoming_webhook():
         ]
     }
     
-    payload_str = json.dumps(test_payload)
-    signature = create_github_signature(payload_str, GITHUB_WEBHOOK_SECRET)
+    payload_bytes = orjson.dumps(test_payload)
+    signature = create_github_signature(payload_bytes)
     
     headers = {
         'Content-Type': 'application/json',
@@ -76,124 +114,108 @@ def test_incoming_webhook():
     }
     
     try:
-        response = requests.post(WEBHOOK_ENDPOINT, data=payload_str, headers=headers, timeout=30)
+        response = await client.post(WEBHOOK_ENDPOINT, content=payload_bytes, headers=headers, timeout=30)
         
         if response.status_code == 200:
-            print("✅ Webhook request successful")
-            print(f"   Response: {response.json()}")
+            logger.info("✅ Webhook request successful")
+            logger.info("   Response: %s", orjson.loads(response.content))
             
-            # Wait a moment for processing
-            time.sleep(2)
+            supabase = get_supabase()
             
-            # Check if webhook was logged
-            result = supabase.table('github_webhook_logs')\
-                .select('*')\
-                .eq('event_type', 'push')\
-                .eq('repository_name', 'test-user/test-repo')\
-                .order('created_at', desc=True)\
-                .limit(1)\
-                .execute()
+            # Fetch the webhook log and the stored commit in one RPC, polling
+            # until processing has written both
+            result = await wait_for_row(
+                lambda: supabase.rpc('get_test_artifacts', {
+                    'sha': 'abc123',
+                    'repo': 'test-user/test-repo'
+                }).execute(),
+                ready=lambda result: bool(result.data and result.data['log'] and result.data['commit'])
+            )
+            artifacts = result.data or {}
             
-            if result.data:
-                print("✅ Webhook logged in database")
-                print(f"   Log ID: {result.data[0]['id']}")
+            if artifacts.get('log'):
+                logger.info("✅ Webhook logged in database")
+                logger.info("   Log ID: %s", artifacts['log']['id'])
             else:
-                print("⚠️ Webhook not found in logs table")
+                logger.info("⚠️ Webhook not found in logs table")
             
             # Check if commit was stored
-            commit_result = supabase.table('github_commits')\
-                .select('*')\
-                .eq('commit_sha', 'abc123')\
-                .limit(1)\
-                .execute()
-            
-            if commit_result.data:
-                print("✅ Commit stored in database")
-                print(f"   Commit: {commit_result.data[0]['message']}")
+            if artifacts.get('commit'):
+                logger.info("✅ Commit stored in database")
+                logger.info("   Commit: %s", artifacts['commit']['message'])
             else:
-                print("⚠️ Commit not found in commits table")
+                logger.info("⚠️ Commit not found in commits table")
                 
         else:
-            print(f"❌ Webhook request failed: {response.status_code}")
-            print(f"   Response: {response.text}")
+            logger.info("❌ Webhook request failed: %s", response.status_code)
+            logger.info("   Response: %s", response.text)
             
     except Exception as e:
-        print(f"❌ Error testing incoming webhook: {e}")
+        logger.info("❌ Error testing incoming webhook: %s", e)
 
-def test_outgoing_webhook():
+async def run_outgoing_webhook():
     """Test outgoing webhook from Supabase to external service"""
-    print("\n🔄 Testing Outgoing Webhook (Supabase → External)")
+    logger.info("\n🔄 Testing Outgoing Webhook (Supabase → External)")
+    
+    if not has_valid_config():
+        logger.info("⏭  Skipped, configuration incomplete")
+        return
     
     try:
-        # First, ensure we have a company and position
-        company_result = supabase.table('companies')\
-            .insert({'name': 'Test Webhook Company'})\
-            .execute()
-        
-        if not company_result.data:
-            print("❌ Failed to create test company")
-            return
-            
-        company_id = company_result.data[0]['id']
-        print(f"✅ Created test company: {company_id}")
-        
-        position_result = supabase.table('positions')\
-            .insert({
-                'company_id': company_id,
-                'title': 'Test Webhook Position'
-            })\
-            .execute()
-        
-        if not position_result.data:
-            print("❌ Failed to create test position")
-            return
-            
-        position_id = position_result.data[0]['id']
-        print(f"✅ Created test position: {position_id}")
+        supabase = get_supabase()
         
-        # Now insert a candidate to trigger the webhook
-        candidate_result = supabase.table('candidates')\
-            .insert({
-                'position_id': position_id,
+        # Company, position and candidate are created in one transactional RPC,
+        # the candidate insert triggers the webhook
+        fixture_result = supabase.rpc('create_test_fixture', {
+            'company_name': 'Test Webhook Company',
+            'position_title': 'Test Webhook Position',
+            'candidate': {
                 'first_name': 'Webhook',
                 'last_name': 'Test',
                 'email': 'webhook-test@example.com',
                 'phone': '+1-555-WEBHOOK',
                 'source_url': 'https://test-webhook-integration.com'
-            })\
-            .execute()
+            }
+        }).execute()
         
-        if candidate_result.data:
-            candidate_id = candidate_result.data[0]['id']
-            print(f"✅ Created test candidate: {candidate_id}")
-            
-            # Wait for webhook to process
-            time.sleep(5)
+        fixture = fixture_result.data
+        if fixture:
+            logger.info("✅ Created test company: %s", fixture['company_id'])
+            logger.info("✅ Created test position: %s", fixture['position_id'])
+            candidate_id = fixture['candidate_id']
+            logger.info("✅ Created test candidate: %s", candidate_id)
             
-            # Check if webhook call was logged
-            api_calls = supabase.table('github_api_calls')\
-                .select('*')\
-                .eq('triggered_by_table', 'candidates')\
-                .eq('triggered_by_id', candidate_id)\
-                .execute()
+            try:
+                # Check if webhook call was logged, polling until the trigger has run
+                api_calls = await wait_for_row(
+                    lambda: supabase.table('github_api_calls')
+                    .select('*')
+                    .eq('triggered_by_table', 'candidates')
+                    .eq('triggered_by_id', candidate_id)
+                    .execute()
+                )
             
-            if api_calls.data:
-                print("✅ Outgoing webhook logged")
-                for call in api_calls.data:
-                    print(f"   Endpoint: {call['endpoint']}")
-                    print(f"   Status: {call.get('response_status', 'Pending')}")
-            else:
-                print("⚠️ No outgoing webhook calls found")
+                if api_calls.data:
+                    logger.info("✅ Outgoing webhook logged")
+                    for call in api_calls.data:
+                        logger.info("   Endpoint: %s", call['endpoint'])
+                        logger.info("   Status: %s", call.get('response_status', 'Pending'))
+                else:
+                    logger.info("⚠️ No outgoing webhook calls found")
+            finally:
+                # Remove what this run created so repeated runs do not pile up rows
+                supabase.rpc('delete_test_fixture', {'ids': fixture}).execute()
+                logger.info("🧹 Removed test fixture")
                 
         else:
-            print("❌ Failed to create test candidate")
+            logger.info("❌ Failed to create test fixture")
             
     except Exception as e:
-        print(f"❌ Error testing outgoing webhook: {e}")
+        logger.info("❌ Error testing outgoing webhook: %s", e)
 
 def test_database_connectivity():
     """Test basic database connectivity and required tables"""
-    print("\n🔄 Testing Database Connectivity")
+    logger.info("\n🔄 Testing Database Connectivity")
     
     required_tables = [
         'github_webhook_logs',
@@ -207,57 +229,69 @@ def test_database_connectivity():
         'candidates'
     ]
     
-    for table in required_tables:
-        try:
-            result = supabase.table(table).select('id').limit(1).execute()
-            print(f"✅ Table '{table}' accessible")
-        except Exception as e:
-            print(f"❌ Table '{table}' error: {e}")
+    if not has_valid_config():
+        logger.info("⏭  Skipped, configuration incomplete")
+        return
+    
+    # One round-trip for every table instead of a query per table
+    try:
+        result = get_supabase().rpc('check_tables', {'names': required_tables}).execute()
+    except Exception as e:
+        logger.info("❌ Table check error: %s", e)
+        return
+    
+    for row in result.data:
+        if row['present']:
+            logger.info("✅ Table '%s' accessible", row['table_name'])
+        else:
+            logger.info("❌ Table '%s' not found or not accessible", row['table_name'])
 
-def test_edge_function_deployment():
+async def check_edge_function_deployment(client):
     """Test if the Edge Function is deployed and accessible"""
-    print("\n🔄 Testing Edge Function Deployment")
+    logger.info("\n🔄 Testing Edge Function Deployment")
     
     try:
         # Test with a simple GET request (should return 405 Method Not Allowed)
-        response = requests.get(WEBHOOK_ENDPOINT, timeout=10)
+        response = await client.get(WEBHOOK_ENDPOINT)
         
         if response.status_code == 405:
-            print("✅ Edge Function is deployed and accessible")
+            logger.info("✅ Edge Function is deployed and accessible")
         elif response.status_code == 404:
-            print("❌ Edge Function not found - check deployment")
+            logger.info("❌ Edge Function not found - check deployment")
         else:
-            print(f"⚠️ Unexpected response from Edge Function: {response.status_code}")
+            logger.info("⚠️ Unexpected response from Edge Function: %s", response.status_code)
             
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Cannot reach Edge Function: {e}")
+    except httpx.HTTPError as e:
+        logger.info("❌ Cannot reach Edge Function: %s", e)
 
 def check_configuration():
     """Check if required configuration is set"""
-    print("\n🔄 Checking Configuration")
+    logger.info("\n🔄 Checking Configuration")
     
-    config_items = [
-        ('SUPABASE_URL', SUPABASE_URL),
-        ('SUPABASE_SERVICE_ROLE_KEY', SUPABASE_KEY),
-        ('GITHUB_WEBHOOK_SECRET', GITHUB_WEBHOOK_SECRET)
-    ]
-    
-    for name, value in config_items:
-        if value and not value.startswith('your-'):
-            print(f"✅ {name} configured")
+    for name, value in CONFIG_ITEMS:
+        if is_configured(value):
+            logger.info("✅ %s configured", name)
         else:
-            print(f"❌ {name} not properly configured")
+            logger.info("❌ %s not properly configured", name)
 
-def main():
+async def main():
     """Run all tests"""
-    print("🪝 Webhook Integration Test Suite")
-    print("=" * 50)
-    
-    check_configuration()
-    test_database_connectivity()
-    test_edge_function_deployment()
-    test_incoming_webhook()
-    test_outgoing_webhook()
+    progress = setup_progress(logger)
+    try:
+        logger.info("🪝 Webhook Integration Test Suite")
+        logger.info("=" * 50)
+        
+        check_configuration()
+        test_database_connectivity()
+        
+        # Both Edge Function checks hit the same host, share one client
+        async with httpx.AsyncClient(http2=True, headers=CLIENT_HEADERS, limits=CLIENT_LIMITS, timeout=10) as client:
+            await check_edge_function_deployment(client)
+            await run_incoming_webhook(client)
+        
+        await run_outgoing_webhook()
+    finally:
+        progress.flush()
     
     print("\n" + "=" * 50)
     print("🎉 Test suite completed!")
@@ -268,4 +302,4 @@ def main():
     print("4. Monitor the github_api_calls table for outbound webhooks")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    asyncio.run(main()) 
\ No newline at end of file